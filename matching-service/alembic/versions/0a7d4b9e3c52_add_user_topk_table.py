@@ -0,0 +1,43 @@
+"""Add user_topk precomputed ranking table
+
+Revision ID: 0a7d4b9e3c52
+Revises: f1c9b6e4a273
+Create Date: 2026-08-31 15:07:52.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a7d4b9e3c52'
+down_revision = 'f1c9b6e4a273'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_topk',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('candidate_user_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('rank_position', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['candidate_user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_topk_id'), 'user_topk', ['id'], unique=False)
+    op.create_index(
+        'ix_user_topk_user_rank',
+        'user_topk',
+        ['user_id', 'rank_position'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_topk_user_rank', table_name='user_topk')
+    op.drop_index(op.f('ix_user_topk_id'), table_name='user_topk')
+    op.drop_table('user_topk')
@@ -0,0 +1,29 @@
+"""Add unique pair index on compatibility_cache
+
+Revision ID: 3f2a1c9d4e71
+Revises:
+Create Date: 2026-08-31 10:12:45.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a1c9d4e71'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "uq_compatibility_cache_pair",
+        "compatibility_cache",
+        ["user1_id", "user2_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_compatibility_cache_pair", table_name="compatibility_cache")
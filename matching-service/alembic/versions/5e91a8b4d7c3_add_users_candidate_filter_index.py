@@ -0,0 +1,28 @@
+"""Add (is_active, gender, age) index on users
+
+Revision ID: 5e91a8b4d7c3
+Revises: b7d0f3a6c254
+Create Date: 2026-08-31 11:58:22.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e91a8b4d7c3'
+down_revision = 'b7d0f3a6c254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_users_active_gender_age",
+        "users",
+        ["is_active", "gender", "age"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_active_gender_age", table_name="users")
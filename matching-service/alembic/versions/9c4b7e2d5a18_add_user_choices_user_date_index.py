@@ -0,0 +1,28 @@
+"""Add (user_id, choice_date) index on user_choices
+
+Revision ID: 9c4b7e2d5a18
+Revises: 3f2a1c9d4e71
+Create Date: 2026-08-31 11:04:12.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4b7e2d5a18'
+down_revision = '3f2a1c9d4e71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_user_choices_user_date",
+        "user_choices",
+        ["user_id", "choice_date"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_choices_user_date", table_name="user_choices")
@@ -0,0 +1,36 @@
+"""Stamp user_choices.choice_date with a server default
+
+Revision ID: a4e8c1f7b592
+Revises: c2f6e9d1a480
+Create Date: 2026-08-31 13:05:33.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e8c1f7b592'
+down_revision = 'c2f6e9d1a480'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "user_choices",
+        "choice_date",
+        existing_type=sa.DateTime(),
+        existing_nullable=False,
+        server_default=sa.func.now(),
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "user_choices",
+        "choice_date",
+        existing_type=sa.DateTime(),
+        existing_nullable=False,
+        server_default=None,
+    )
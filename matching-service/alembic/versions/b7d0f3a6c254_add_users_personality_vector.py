@@ -0,0 +1,47 @@
+"""Add denormalized personality_vector blob on users
+
+Revision ID: b7d0f3a6c254
+Revises: 9c4b7e2d5a18
+Create Date: 2026-08-31 11:31:45.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d0f3a6c254'
+down_revision = '9c4b7e2d5a18'
+branch_labels = None
+depends_on = None
+
+PERSONALITY_QUESTIONS_COUNT = 10
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("personality_vector", sa.LargeBinary(10), nullable=True),
+    )
+
+    # Backfill from the existing response rows so scoring can read the blob
+    # for users who completed the questionnaire before this migration
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT user_id, question_id, response_value "
+        "FROM personality_responses ORDER BY user_id, question_id"
+    )).all()
+
+    vectors = {}
+    for user_id, question_id, response_value in rows:
+        vectors.setdefault(user_id, {})[question_id] = response_value
+
+    update = sa.text("UPDATE users SET personality_vector = :vec WHERE id = :uid")
+    for user_id, answers in vectors.items():
+        if len(answers) == PERSONALITY_QUESTIONS_COUNT:
+            packed = bytes(answers[q] for q in sorted(answers))
+            bind.execute(update, {"vec": packed, "uid": user_id})
+
+
+def downgrade() -> None:
+    op.drop_column("users", "personality_vector")
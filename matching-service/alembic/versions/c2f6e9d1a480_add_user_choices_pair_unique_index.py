@@ -0,0 +1,29 @@
+"""Add unique (user_id, chosen_user_id) index on user_choices
+
+Revision ID: c2f6e9d1a480
+Revises: 5e91a8b4d7c3
+Create Date: 2026-08-31 12:21:07.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f6e9d1a480'
+down_revision = '5e91a8b4d7c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "uq_user_choices_pair",
+        "user_choices",
+        ["user_id", "chosen_user_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_user_choices_pair", table_name="user_choices")
@@ -0,0 +1,29 @@
+"""Add unique (user_id, question_id) index on personality_responses
+
+Revision ID: d8b2a5c3e916
+Revises: a4e8c1f7b592
+Create Date: 2026-08-31 13:18:54.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8b2a5c3e916'
+down_revision = 'a4e8c1f7b592'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "uq_personality_user_question",
+        "personality_responses",
+        ["user_id", "question_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_personality_user_question", table_name="personality_responses")
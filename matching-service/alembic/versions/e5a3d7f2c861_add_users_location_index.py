@@ -0,0 +1,28 @@
+"""Add (location_latitude, location_longitude) index on users
+
+Revision ID: e5a3d7f2c861
+Revises: d8b2a5c3e916
+Create Date: 2026-08-31 14:02:41.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a3d7f2c861'
+down_revision = 'd8b2a5c3e916'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_users_location",
+        "users",
+        ["location_latitude", "location_longitude"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_location", table_name="users")
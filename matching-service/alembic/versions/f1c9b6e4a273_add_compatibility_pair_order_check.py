@@ -0,0 +1,32 @@
+"""Add pair-order check constraint on compatibility_cache
+
+Revision ID: f1c9b6e4a273
+Revises: e5a3d7f2c861
+Create Date: 2026-08-31 14:29:18.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c9b6e4a273'
+down_revision = 'e5a3d7f2c861'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_check_constraint(
+        "ck_compatibility_pair_order",
+        "compatibility_cache",
+        "user1_id <= user2_id",
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        "ck_compatibility_pair_order",
+        "compatibility_cache",
+        type_="check",
+    )
@@ -1,20 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from datetime import datetime
+from datetime import datetime, timedelta
 
+import numpy as np
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core import cache
 from app.core.database import get_db
-from app.services.matching_service import MatchingService
+from app.services.matching_service import MatchingService, score_personality_matrix
 from app.schemas.matching import (
-    DailySelectionResponse, 
-    CompatibilityScoreRequest, 
+    DailySelectionResponse,
+    CompatibilityScoreRequest,
     CompatibilityScoreResponse,
     UserChoiceCreate,
     UserChoiceResponse,
     MatchingRequest,
     MatchingResponse
 )
-from app.core.config import settings
+from app.core.config import Settings, get_settings
 from app.models.user import User, UserChoice
 
 router = APIRouter()
@@ -22,73 +27,112 @@ router = APIRouter()
 @router.get("/daily-selection/{user_id}", response_model=DailySelectionResponse)
 async def get_daily_selection(
     user_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get daily selection of profiles for a user.
     Returns 3-5 highly compatible profiles based on personality matching.
     """
-    # Check if user exists
-    user = db.query(User).filter(User.id == user_id).first()
+    # The selection is immutable until midnight; advertise that so the
+    # NestJS gateway can serve repeat reads from its own cache
+    response.headers["Cache-Control"] = (
+        f"private, max-age={cache.seconds_until_utc_midnight()}"
+    )
+
+    # Steady-state reads are served straight from Redis: the selection is
+    # immutable until midnight, so a hit skips the database entirely
+    cache_key = cache.daily_selection_key(user_id)
+    cached = await cache.cache_get(cache_key)
+    if cached is not None:
+        return DailySelectionResponse.model_validate_json(cached)
+
+    # Check if user exists; Session.get() hits the identity map first and
+    # uses a pre-compiled primary-key SELECT on a miss
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
+
     matching_service = MatchingService(db)
-    candidates = matching_service.get_today_selection(user_id)
-    
+    candidates = await matching_service.get_today_selection(user_id)
+
     # Determine max choices based on subscription
     max_choices = 3 if user.is_premium else 1
-    
-    return DailySelectionResponse(
+
+    # construct() skips re-validating the candidate models the service
+    # just built
+    response = DailySelectionResponse.model_construct(
         user_id=user_id,
         selection_date=datetime.utcnow(),
         candidates=candidates,
         max_choices_allowed=max_choices
     )
+    await cache.cache_set(cache_key, response.model_dump_json(), cache.seconds_until_utc_midnight())
+    return response
 
 @router.post("/generate-selection/{user_id}", response_model=DailySelectionResponse)
 async def generate_new_selection(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Force generate a new daily selection for a user.
     Useful for testing or manual triggers.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
+
     matching_service = MatchingService(db)
-    candidates = matching_service.generate_daily_selection(user_id)
-    
+    candidates = await matching_service.generate_daily_selection(user_id)
+
     max_choices = 3 if user.is_premium else 1
-    
-    return DailySelectionResponse(
+
+    response = DailySelectionResponse.model_construct(
         user_id=user_id,
         selection_date=datetime.utcnow(),
         candidates=candidates,
         max_choices_allowed=max_choices
     )
+    # A forced regeneration supersedes whatever was cached for today
+    await cache.cache_set(cache.daily_selection_key(user_id), response.model_dump_json(),
+                          cache.seconds_until_utc_midnight())
+    return response
 
 @router.post("/compatibility-score", response_model=CompatibilityScoreResponse)
 async def calculate_compatibility(
     request: CompatibilityScoreRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Calculate compatibility score between two users.
     """
-    # Check if both users exist
-    user1 = db.query(User).filter(User.id == request.user1_id).first()
-    user2 = db.query(User).filter(User.id == request.user2_id).first()
-    
-    if not user1 or not user2:
+    # Hot pairs resolve to a single Redis GET, skipping the user loads and
+    # the personality-vector recomputation entirely.
+    cached = await cache.cache_get(
+        cache.compatibility_key(request.user1_id, request.user2_id)
+    )
+    if cached is not None:
+        return CompatibilityScoreResponse(
+            user1_id=request.user1_id,
+            user2_id=request.user2_id,
+            compatibility_score=float(cached),
+            calculated_at=datetime.utcnow()
+        )
+
+    # Cache miss: check that both users exist without hydrating them — the
+    # service fetches the personality vectors itself
+    result = await db.execute(
+        select(User.id).where(User.id.in_([request.user1_id, request.user2_id]))
+    )
+    found_ids = set(result.scalars().all())
+
+    if found_ids != {request.user1_id, request.user2_id}:
         raise HTTPException(status_code=404, detail="One or both users not found")
-    
+
     matching_service = MatchingService(db)
-    score = matching_service.calculate_compatibility_score(request.user1_id, request.user2_id)
-    
+    score = await matching_service.calculate_compatibility_score(request.user1_id, request.user2_id)
+
     return CompatibilityScoreResponse(
         user1_id=request.user1_id,
         user2_id=request.user2_id,
@@ -100,143 +144,188 @@ async def calculate_compatibility(
 async def make_user_choice(
     user_id: int,
     choice: UserChoiceCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Record a user's choice and check for mutual match.
     """
-    # Check if user exists
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Check if chosen user exists
-    chosen_user = db.query(User).filter(User.id == choice.chosen_user_id).first()
-    if not chosen_user:
-        raise HTTPException(status_code=404, detail="Chosen user not found")
-    
-    # Check daily choice limit
+    # The chooser's premium flag changes rarely; a cache hit narrows the
+    # existence check to the chosen user only
+    cached_premium = await cache.cache_get(cache.premium_status_key(user_id))
+    if cached_premium is not None:
+        is_premium = cached_premium == "1"
+        result = await db.execute(
+            select(User.id).where(User.id == choice.chosen_user_id)
+        )
+        if result.first() is None:
+            raise HTTPException(status_code=404, detail="Chosen user not found")
+    else:
+        # Check both users in a single round-trip
+        result = await db.execute(
+            select(User.id, User.is_premium)
+            .where(User.id.in_([user_id, choice.chosen_user_id]))
+        )
+        users_by_id = {row.id: row for row in result.all()}
+        if user_id not in users_by_id:
+            raise HTTPException(status_code=404, detail="User not found")
+        if choice.chosen_user_id not in users_by_id:
+            raise HTTPException(status_code=404, detail="Chosen user not found")
+        is_premium = users_by_id[user_id].is_premium
+        await cache.cache_set(cache.premium_status_key(user_id),
+                              "1" if is_premium else "0",
+                              cache.PREMIUM_STATUS_TTL_SECONDS)
+
+    # Check the daily choice limit with a capped probe: the query stops as
+    # soon as the max-th choice of the day is found instead of counting every
+    # row the user created today (max is at most 3)
+    max_choices = 3 if is_premium else 1
     today = datetime.utcnow().date()
-    today_choices = db.query(UserChoice).filter(
-        UserChoice.user_id == user_id,
-        UserChoice.choice_date >= datetime.combine(today, datetime.min.time())
-    ).count()
-    
-    max_choices = 3 if user.is_premium else 1
-    if today_choices >= max_choices:
+    today_start = datetime.combine(today, datetime.min.time())
+    result = await db.execute(
+        select(UserChoice.id)
+        .where(
+            UserChoice.user_id == user_id,
+            UserChoice.choice_date >= today_start
+        )
+        .offset(max_choices - 1)
+        .limit(1)
+    )
+    if result.first() is not None:
         raise HTTPException(
-            status_code=429, 
+            status_code=429,
             detail=f"Daily choice limit exceeded. You can make {max_choices} choices per day."
         )
-    
-    # Create user choice
-    user_choice = UserChoice(
-        user_id=user_id,
-        chosen_user_id=choice.chosen_user_id,
-        choice_date=datetime.utcnow()
+
+    # It's a mutual match if the chosen user already picked us back; flag
+    # the reverse choice and learn whether it exists in one round-trip
+    result = await db.execute(
+        update(UserChoice)
+        .where(
+            UserChoice.user_id == choice.chosen_user_id,
+            UserChoice.chosen_user_id == user_id
+        )
+        .values(is_match=True)
+        .returning(UserChoice.id)
     )
-    
-    # Check if it's a mutual match
-    reverse_choice = db.query(UserChoice).filter(
-        UserChoice.user_id == choice.chosen_user_id,
-        UserChoice.chosen_user_id == user_id
-    ).first()
-    
-    if reverse_choice:
-        user_choice.is_match = True
-        reverse_choice.is_match = True
-        db.add(reverse_choice)
-    
-    db.add(user_choice)
-    db.commit()
-    db.refresh(user_choice)
-    
+    is_match = result.scalar() is not None
+
+    # INSERT ... RETURNING replaces the ORM flush plus the refresh SELECT;
+    # the unique pair index rejects duplicates without a pre-check SELECT
+    try:
+        # choice_date is stamped server-side (and read back via RETURNING),
+        # keeping timestamps consistent across workers with drifting clocks
+        result = await db.execute(
+            insert(UserChoice)
+            .values(
+                user_id=user_id,
+                chosen_user_id=choice.chosen_user_id,
+                is_match=is_match
+            )
+            .returning(UserChoice.id, UserChoice.choice_date)
+        )
+        new_choice = result.one()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="You have already chosen this user"
+        )
+
     return UserChoiceResponse(
-        id=user_choice.id,
-        user_id=user_choice.user_id,
-        chosen_user_id=user_choice.chosen_user_id,
-        choice_date=user_choice.choice_date,
-        is_match=user_choice.is_match
+        id=new_choice.id,
+        user_id=user_id,
+        chosen_user_id=choice.chosen_user_id,
+        choice_date=new_choice.choice_date,
+        is_match=is_match
     )
 
 @router.get("/user-choices/{user_id}", response_model=List[UserChoiceResponse])
 async def get_user_choices(
     user_id: int,
     limit: int = 20,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get user's choice history.
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    result = await db.execute(select(User.id).where(User.id == user_id))
+    if result.first() is None:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    choices = db.query(UserChoice)\
-        .filter(UserChoice.user_id == user_id)\
-        .order_by(UserChoice.choice_date.desc())\
-        .limit(limit)\
-        .all()
-    
-    return [
-        UserChoiceResponse(
-            id=choice.id,
-            user_id=choice.user_id,
-            chosen_user_id=choice.chosen_user_id,
-            choice_date=choice.choice_date,
-            is_match=choice.is_match
+
+    # Select only the response columns and skip Pydantic validation: the
+    # rows come straight from the database in the right types, so per-row
+    # ORM hydration and field validation are pure overhead here
+    result = await db.execute(
+        select(
+            UserChoice.id,
+            UserChoice.user_id,
+            UserChoice.chosen_user_id,
+            UserChoice.choice_date,
+            UserChoice.is_match
         )
-        for choice in choices
-    ]
+        .where(UserChoice.user_id == user_id)
+        .order_by(UserChoice.choice_date.desc())
+        .limit(limit)
+    )
+
+    return [UserChoiceResponse.model_construct(**row._mapping) for row in result.all()]
 
 @router.post("/matching-candidates", response_model=MatchingResponse)
 async def get_matching_candidates(
     request: MatchingRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    settings: Settings = Depends(get_settings)
 ):
     """
     Get matching candidates for a user with optional filtering.
     Used by the main API for custom matching requests.
     """
-    user = db.query(User).filter(User.id == request.user_id).first()
+    user = await db.get(User, request.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
+
     matching_service = MatchingService(db)
-    
-    # Temporarily exclude specified users
-    original_excluded = matching_service._get_excluded_user_ids(request.user_id)
-    all_excluded = list(set(original_excluded + (request.exclude_user_ids or [])))
-    
-    # Get potential candidates manually
-    candidates = matching_service._get_potential_candidates(user, all_excluded)
-    
-    # Score and rank candidates
-    scored_candidates = []
-    for candidate in candidates:
-        score = matching_service.calculate_compatibility_score(request.user_id, candidate.id)
-        if score >= settings.COMPATIBILITY_THRESHOLD:
-            scored_candidates.append((candidate, score))
-    
-    # Sort and limit
-    scored_candidates.sort(key=lambda x: x[1], reverse=True)
+
+    # Get potential candidates; the standard exclusions are anti-joined in
+    # SQL and the request-specific ones ride along as an extra NOT IN
+    candidates = await matching_service._get_potential_candidates(
+        user, request.exclude_user_ids or []
+    )
+
     max_results = min(request.max_results or 5, 10)  # Max 10 results
-    top_candidates = scored_candidates[:max_results]
-    
-    # Convert to response format
+    requester_vector = await matching_service._get_personality_vector(request.user_id)
+
     result_candidates = []
-    for i, (candidate, score) in enumerate(top_candidates):
-        result_candidates.append({
-            "user_id": candidate.id,
-            "first_name": candidate.first_name,
-            "age": candidate.age,
-            "location_city": candidate.location_city,
-            "compatibility_score": score,
-            "rank_position": i + 1
-        })
-    
+    if candidates and requester_vector is not None:
+        # Score all candidates against the requester in one vectorized
+        # pass instead of one Python scoring call per candidate
+        matrix, complete = matching_service._stack_candidate_vectors(candidates)
+        scores = score_personality_matrix(matrix, requester_vector)
+
+        # Candidates without a complete questionnaire cannot be scored
+        eligible = np.where(
+            complete & (scores >= settings.COMPATIBILITY_THRESHOLD)
+        )[0]
+        # O(N) partition to isolate the k best, then sort only those k —
+        # cheaper than fully sorting the pool to keep at most 10 rows
+        k = min(max_results, eligible.size)
+        top = eligible[np.argpartition(-scores[eligible], k - 1)[:k]] if k else eligible
+        top = top[np.argsort(-scores[top])]
+
+        for rank, matrix_row in enumerate(top):
+            candidate = candidates[matrix_row]
+            result_candidates.append({
+                "user_id": candidate.id,
+                "first_name": candidate.first_name,
+                "age": candidate.age,
+                "location_city": candidate.location_city,
+                "compatibility_score": float(scores[matrix_row]),
+                "rank_position": rank + 1
+            })
+
     return MatchingResponse(
         user_id=request.user_id,
         candidates=result_candidates,
         generated_at=datetime.utcnow()
-    )
\ No newline at end of file
+    )
@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
+from app.core import cache
 from app.core.database import get_db
 from app.schemas.matching import (
-    User, 
-    UserCreate, 
-    PersonalityQuestionnaireCreate, 
+    User,
+    UserCreate,
+    PersonalityQuestionnaireCreate,
     PersonalityResponse
 )
 from app.models.user import User as UserModel, PersonalityResponse as PersonalityResponseModel
@@ -16,155 +20,215 @@ router = APIRouter()
 @router.post("/", response_model=User)
 async def create_user(
     user: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new user.
     This endpoint is typically called by the main NestJS API.
     """
     # Check if user already exists
-    existing_user = db.query(UserModel).filter(UserModel.email == user.email).first()
+    result = await db.execute(select(UserModel).where(UserModel.email == user.email))
+    existing_user = result.scalar_one_or_none()
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
-    
-    db_user = UserModel(**user.dict())
+
+    db_user = UserModel(**user.model_dump())
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
+    await db.commit()
+    await db.refresh(db_user)
+
     return User.model_validate(db_user)
 
 @router.get("/{user_id}", response_model=User)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get user by ID.
     """
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
+    # Session.get() checks the identity map first and uses the pre-compiled
+    # primary-key SELECT on a miss
+    user = await db.get(UserModel, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
+
     return User.model_validate(user)
 
 @router.post("/{user_id}/personality", response_model=List[PersonalityResponse])
 async def submit_personality_questionnaire(
     user_id: int,
     questionnaire: PersonalityQuestionnaireCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Submit personality questionnaire responses for a user.
     This is required before the user can receive matches.
     """
     # Check if user exists
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
+    user = await db.get(UserModel, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
+
     # Validate questionnaire completeness
     if len(questionnaire.responses) != 10:  # Based on specs: 10 personality questions
         raise HTTPException(
-            status_code=400, 
+            status_code=400,
             detail="Personality questionnaire must have exactly 10 responses"
         )
-    
-    # Remove existing responses
-    db.query(PersonalityResponseModel)\
-        .filter(PersonalityResponseModel.user_id == user_id)\
-        .delete()
-    
-    # Add new responses
-    db_responses = []
+
+    # Validate every response before touching the database
     for response in questionnaire.responses:
         if not (1 <= response.question_id <= 10):
             raise HTTPException(
-                status_code=400, 
+                status_code=400,
                 detail=f"Invalid question_id: {response.question_id}. Must be between 1 and 10."
             )
-        
+
         if not (1 <= response.response_value <= 5):
             raise HTTPException(
-                status_code=400, 
+                status_code=400,
                 detail=f"Invalid response_value: {response.response_value}. Must be between 1 and 5."
             )
-        
-        db_response = PersonalityResponseModel(
-            user_id=user_id,
-            question_id=response.question_id,
-            response_value=response.response_value
+
+    # Ten in-range answers can still double-cover a question and leave
+    # another unanswered; Postgres rejects a multi-row upsert touching the
+    # same (user_id, question_id) twice, so refuse it here as a 400 rather
+    # than surfacing a 500
+    question_ids = {response.question_id for response in questionnaire.responses}
+    if len(question_ids) != len(questionnaire.responses):
+        raise HTTPException(
+            status_code=400,
+            detail="Each question must be answered exactly once"
         )
-        db.add(db_response)
-        db_responses.append(db_response)
-    
-    db.commit()
-    
-    # Refresh all responses
-    for response in db_responses:
-        db.refresh(response)
-    
-    return [PersonalityResponse.model_validate(response) for response in db_responses]
+
+    # Maintain the denormalized 10-byte vector the scoring paths read,
+    # in the same transaction as the response rows
+    user.personality_vector = bytes(
+        response.response_value
+        for response in sorted(questionnaire.responses, key=lambda r: r.question_id)
+    )
+
+    # One multi-row upsert replaces the old DELETE-then-INSERT dance: a
+    # single lock phase, no window where the user has no personality, and
+    # RETURNING still hands back the server-generated id/created_at.
+    # Tests run on SQLite, so pick the dialect's insert for ON CONFLICT.
+    insert_fn = sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+    stmt = insert_fn(PersonalityResponseModel).values([
+        {
+            "user_id": user_id,
+            "question_id": response.question_id,
+            "response_value": response.response_value
+        }
+        for response in questionnaire.responses
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "question_id"],
+        set_={"response_value": stmt.excluded.response_value}
+    ).returning(
+        PersonalityResponseModel.id,
+        PersonalityResponseModel.user_id,
+        PersonalityResponseModel.question_id,
+        PersonalityResponseModel.response_value,
+        PersonalityResponseModel.created_at,
+    )
+    result = await db.execute(stmt)
+    returned = result.all()
+    await db.commit()
+
+    # New answers change every score this user appears in; today's cached
+    # selection is stale the moment the commit lands
+    await cache.cache_delete(cache.daily_selection_key(user_id))
+
+    return [PersonalityResponse(**row._mapping) for row in returned]
 
 @router.get("/{user_id}/personality", response_model=List[PersonalityResponse])
 async def get_personality_responses(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get personality questionnaire responses for a user.
     """
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if not user:
+    result = await db.execute(select(UserModel.id).where(UserModel.id == user_id))
+    if result.first() is None:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    responses = db.query(PersonalityResponseModel)\
-        .filter(PersonalityResponseModel.user_id == user_id)\
-        .order_by(PersonalityResponseModel.question_id)\
-        .all()
-    
-    return [PersonalityResponse.model_validate(response) for response in responses]
+
+    # Narrow SELECT plus construct(): no ORM hydration and no per-row
+    # Pydantic validation of values the database already typed correctly
+    result = await db.execute(
+        select(
+            PersonalityResponseModel.id,
+            PersonalityResponseModel.user_id,
+            PersonalityResponseModel.question_id,
+            PersonalityResponseModel.response_value,
+            PersonalityResponseModel.created_at
+        )
+        .where(PersonalityResponseModel.user_id == user_id)
+        .order_by(PersonalityResponseModel.question_id)
+    )
+
+    return [PersonalityResponse.model_construct(**row._mapping) for row in result.all()]
 
 @router.put("/{user_id}/premium", response_model=User)
 async def update_premium_status(
     user_id: int,
     is_premium: bool,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update user's premium subscription status.
     Called by the main API when subscription status changes.
     """
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
+    user = await db.get(UserModel, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
+
     user.is_premium = is_premium
-    db.commit()
-    db.refresh(user)
-    
+    await db.commit()
+    await db.refresh(user)
+
+    # Drop the cached premium flag and today's selection, which bakes in
+    # max_choices_allowed
+    await cache.cache_delete(
+        cache.premium_status_key(user_id),
+        cache.daily_selection_key(user_id),
+    )
+
     return User.model_validate(user)
 
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a user and all associated data.
     Used for GDPR compliance and account deletion.
     """
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if not user:
+    # Existence probe without hydrating the ORM instance; the deletes below
+    # are Core statements, so the row itself is never needed in Python
+    result = await db.execute(select(1).where(UserModel.id == user_id))
+    if result.scalar() is None:
         raise HTTPException(status_code=404, detail="User not found")
-    
+
     # Delete associated data (cascade should handle this, but being explicit)
-    db.query(PersonalityResponseModel)\
-        .filter(PersonalityResponseModel.user_id == user_id)\
-        .delete()
-    
+    await db.execute(
+        delete(PersonalityResponseModel)
+        .where(PersonalityResponseModel.user_id == user_id)
+    )
+
     # Delete user
-    db.delete(user)
-    db.commit()
-    
-    return {"message": f"User {user_id} deleted successfully"}
\ No newline at end of file
+    await db.execute(delete(UserModel).where(UserModel.id == user_id))
+    await db.commit()
+
+    # Drop the cached premium flag and today's selection; otherwise the
+    # deleted user's selection keeps being served from cache until
+    # midnight, and a cached premium flag lets make_user_choice skip the
+    # chooser existence probe within its TTL
+    await cache.cache_delete(
+        cache.premium_status_key(user_id),
+        cache.daily_selection_key(user_id),
+    )
+
+    return {"message": f"User {user_id} deleted successfully"}
@@ -0,0 +1,70 @@
+"""
+Redis-backed caching helpers.
+
+The cache is strictly an accelerator: every helper degrades to a cache miss
+or a no-op when Redis is unreachable, so request handling never depends on
+cache availability.
+"""
+import logging
+from datetime import datetime, time, timedelta
+from typing import Optional
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+redis_client = aioredis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    socket_connect_timeout=1,
+    socket_timeout=1,
+)
+
+# Premium status changes rarely; a short TTL bounds staleness if an
+# invalidation is ever missed
+PREMIUM_STATUS_TTL_SECONDS = 300
+
+# Compatibility scores are stable for a day; the TTL replaces the old
+# calculated_at cutoff filtering
+COMPATIBILITY_TTL_SECONDS = 86400
+
+def compatibility_key(user1_id: int, user2_id: int) -> str:
+    """Cache key for a user pair's compatibility score, order-insensitive."""
+    if user1_id > user2_id:
+        user1_id, user2_id = user2_id, user1_id
+    return f"cs:{user1_id}:{user2_id}"
+
+def daily_selection_key(user_id: int) -> str:
+    """Cache key for a user's selection of the current UTC day."""
+    return f"daily_selection:{user_id}:{datetime.utcnow():%Y-%m-%d}"
+
+def premium_status_key(user_id: int) -> str:
+    return f"user:premium:{user_id}"
+
+def seconds_until_utc_midnight() -> int:
+    """TTL aligning a cached daily selection with the next selection day."""
+    now = datetime.utcnow()
+    midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+    return max(int((midnight - now).total_seconds()), 1)
+
+async def cache_get(key: str) -> Optional[str]:
+    try:
+        return await redis_client.get(key)
+    except RedisError:
+        logger.debug("Redis GET failed for %s; treating as miss", key)
+        return None
+
+async def cache_set(key: str, value: str, ttl_seconds: int) -> None:
+    try:
+        await redis_client.set(key, value, ex=ttl_seconds)
+    except RedisError:
+        logger.debug("Redis SET failed for %s; skipping", key)
+
+async def cache_delete(*keys: str) -> None:
+    try:
+        await redis_client.delete(*keys)
+    except RedisError:
+        logger.debug("Redis DEL failed for %s; skipping", keys)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import CheckConstraint, Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, JSON, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -7,7 +7,13 @@ from typing import Optional
 
 class User(Base):
     __tablename__ = "users"
-    
+    __table_args__ = (
+        # Covers the candidate pre-filter (is_active, gender, age range)
+        Index("ix_users_active_gender_age", "is_active", "gender", "age"),
+        # Backs the bounding-box range scan of the geo filter
+        Index("ix_users_location", "location_latitude", "location_longitude"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
     first_name = Column(String, nullable=False)
@@ -18,17 +24,40 @@ class User(Base):
     location_longitude = Column(Float, nullable=True)
     is_premium = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
+    # Denormalized questionnaire answers, one byte per question in question
+    # order; lets scoring fetch a 10-byte blob instead of 10 joined rows
+    personality_vector = Column(LargeBinary(10), nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    personality_responses = relationship("PersonalityResponse", back_populates="user")
-    daily_selections = relationship("DailySelection", foreign_keys="DailySelection.user_id", back_populates="user")
-    user_choices = relationship("UserChoice", back_populates="user")
+    # Personality responses are needed by every scoring path, so load them
+    # eagerly in one SELECT ... WHERE user_id IN (...) instead of lazily per user.
+    # The bookkeeping relationships are never traversed from a User instance;
+    # lazy="raise" turns an accidental N+1 into a loud test failure.
+    personality_responses = relationship(
+        "PersonalityResponse", back_populates="user", lazy="selectin"
+    )
+    daily_selections = relationship(
+        "DailySelection",
+        foreign_keys="DailySelection.user_id",
+        back_populates="user",
+        lazy="raise",
+    )
+    user_choices = relationship(
+        "UserChoice",
+        foreign_keys="UserChoice.user_id",
+        back_populates="user",
+        lazy="raise",
+    )
 
 class PersonalityResponse(Base):
     __tablename__ = "personality_responses"
-    
+    __table_args__ = (
+        # Conflict target for the questionnaire upsert
+        Index("uq_personality_user_question", "user_id", "question_id", unique=True),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     question_id = Column(Integer, nullable=False)  # 1-10 for the 10 personality questions
@@ -55,21 +84,49 @@ class DailySelection(Base):
 
 class UserChoice(Base):
     __tablename__ = "user_choices"
-    
+    __table_args__ = (
+        # Makes the capped daily-limit probe an index-only range scan
+        Index("ix_user_choices_user_date", "user_id", "choice_date"),
+        # Turns the reverse-match probe into a single B-tree descent and
+        # enforces that a user cannot pick the same person twice
+        Index("uq_user_choices_pair", "user_id", "chosen_user_id", unique=True),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     chosen_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    choice_date = Column(DateTime, nullable=False)
+    # Stamped by the database so timestamps are consistent across workers
+    choice_date = Column(DateTime, nullable=False, server_default=func.now())
     is_match = Column(Boolean, default=False)  # True if both users chose each other
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationship
-    user = relationship("User", back_populates="user_choices")
+    user = relationship("User", foreign_keys=[user_id], back_populates="user_choices")
     chosen_user = relationship("User", foreign_keys=[chosen_user_id])
 
+class UserTopK(Base):
+    """Nightly-materialized top-K compatibility ranking per user."""
+    __tablename__ = "user_topk"
+    __table_args__ = (
+        # Daily-selection reads are an index range scan in rank order
+        Index("ix_user_topk_user_rank", "user_id", "rank_position"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    candidate_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    score = Column(Float, nullable=False)
+    rank_position = Column(Integer, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
 class CompatibilityCache(Base):
     __tablename__ = "compatibility_cache"
-    
+    __table_args__ = (
+        Index("uq_compatibility_cache_pair", "user1_id", "user2_id", unique=True),
+        # The pair is stored in canonical order; reject rows that are not
+        CheckConstraint("user1_id <= user2_id", name="ck_compatibility_pair_order"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     user1_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     user2_id = Column(Integer, ForeignKey("users.id"), nullable=False)
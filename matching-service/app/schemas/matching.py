@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
 from datetime import datetime
 
@@ -19,9 +19,8 @@ class User(UserBase):
     is_premium: bool = False
     is_active: bool = True
     created_at: datetime
-    
-    class Config:
-        orm_mode = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 class PersonalityResponseBase(BaseModel):
     question_id: int
@@ -34,9 +33,8 @@ class PersonalityResponse(PersonalityResponseBase):
     id: int
     user_id: int
     created_at: datetime
-    
-    class Config:
-        orm_mode = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 class PersonalityQuestionnaireCreate(BaseModel):
     responses: List[PersonalityResponseCreate]
@@ -48,9 +46,8 @@ class DailySelectionCandidate(BaseModel):
     location_city: str
     compatibility_score: float
     rank_position: int
-    
-    class Config:
-        orm_mode = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 class DailySelectionResponse(BaseModel):
     user_id: int
@@ -67,9 +64,8 @@ class UserChoiceResponse(BaseModel):
     chosen_user_id: int
     choice_date: datetime
     is_match: bool
-    
-    class Config:
-        orm_mode = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 class CompatibilityScoreRequest(BaseModel):
     user1_id: int
@@ -1,155 +1,253 @@
 import numpy as np
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, not_, func
+from sqlalchemy import and_, bindparam, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Tuple, Optional
 from datetime import datetime, timedelta
 import math
 
-from app.models.user import User, PersonalityResponse, DailySelection, UserChoice, CompatibilityCache
+try:
+    import simsimd
+except ImportError:  # optional SIMD accelerator
+    simsimd = None
+
+from app.core import cache
+from app.models.user import User, PersonalityResponse, DailySelection, UserChoice, UserTopK
 from app.schemas.matching import DailySelectionCandidate
 from app.core.config import settings
+from app.services._kernels import PERSONALITY_SCALE_SPAN, make_score_kernel, score_all
+
+# Kernel specialized to the questionnaire length; the fixed trip count
+# lets the JIT unroll the inner loop completely
+_score_fixed = make_score_kernel(settings.PERSONALITY_QUESTIONS_COUNT)
+
+def score_personality_matrix(matrix: np.ndarray, vector: np.ndarray) -> np.ndarray:
+    """
+    Score every row of a candidate response matrix against one user's vector
+    in a single fused pass through the JIT-compiled kernel.
+
+    Compatibility is the normalized L1 agreement between response vectors:
+    1.0 for identical answers, 0.0 for maximally opposed answers.
+
+    Answers fit in a byte, so the kernel reads uint8 arrays: a quarter of
+    the float32 memory traffic per scored candidate.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.uint8)
+    vector = np.ascontiguousarray(vector, dtype=np.uint8)
+    out = np.empty(matrix.shape[0], dtype=np.float32)
+    # The standard questionnaire length takes the unrolled kernel; anything
+    # else (tests, future question counts) falls back to the generic loop
+    if matrix.shape[1] == settings.PERSONALITY_QUESTIONS_COUNT:
+        _score_fixed(matrix, vector, out)
+    else:
+        score_all(matrix, vector, out)
+    # fastmath reassociation can leave scores epsilon outside the valid range
+    return np.clip(out, 0.0, 1.0)
+
+def warmup_fixed_kernel():
+    """Trigger JIT compilation of the specialized kernel at startup."""
+    out = np.empty(1, dtype=np.float32)
+    for dtype in (np.uint8, np.float32):
+        matrix = np.zeros((1, settings.PERSONALITY_QUESTIONS_COUNT), dtype=dtype)
+        _score_fixed(matrix, matrix[0], out)
+
+# Built once at import: the vector fetch runs on every scoring call, so it
+# should not pay select() construction (and, with SQLAlchemy's compiled
+# cache keyed on these constants, no re-compilation) per call
+_PERSONALITY_PACKED_STMT = (
+    select(User.personality_vector)
+    .where(User.id == bindparam("uid"))
+)
+_PERSONALITY_ROWS_STMT = (
+    select(PersonalityResponse.response_value)
+    .where(PersonalityResponse.user_id == bindparam("uid"))
+    .order_by(PersonalityResponse.question_id)
+)
 
 class MatchingService:
     """
     Content-based matching service for GoldWen MVP.
     Implements personality-based compatibility scoring.
+
+    All database access goes through an AsyncSession so queries never block
+    the FastAPI event loop.
     """
-    
-    def __init__(self, db: Session):
+
+    # Candidate search radius, applied as sargable lat/lon ranges
+    MATCH_RADIUS_KM = 100.0
+    KM_PER_DEGREE_LAT = 111.0
+
+    # Vector length from which the SimSIMD cosine kernel is worth the call
+    SIMSIMD_MIN_DIM = 64
+
+    def __init__(self, db: AsyncSession):
         self.db = db
-        
-    def calculate_compatibility_score(self, user1_id: int, user2_id: int) -> float:
+
+    async def calculate_compatibility_score(self, user1_id: int, user2_id: int) -> float:
         """
         Calculate compatibility score between two users based on personality responses.
-        Uses cosine similarity on personality question responses.
+        Uses the same normalized L1 agreement metric as the batched kernel so
+        cached pairwise scores and vectorized batch scores always agree.
         """
         # Check cache first
-        cached_score = self._get_cached_compatibility(user1_id, user2_id)
+        cached_score = await self._get_cached_compatibility(user1_id, user2_id)
         if cached_score is not None:
             return cached_score
-        
+
         # Get personality responses for both users
-        user1_responses = self._get_personality_vector(user1_id)
-        user2_responses = self._get_personality_vector(user2_id)
-        
-        if not user1_responses or not user2_responses:
+        user1_vector = await self._get_personality_vector(user1_id)
+        user2_vector = await self._get_personality_vector(user2_id)
+
+        if user1_vector is None or user2_vector is None:
             return 0.0
-        
-        # Calculate cosine similarity
-        score = self._cosine_similarity(user1_responses, user2_responses)
-        
+
+        # Score the pair with the shared vectorized kernel
+        score = float(score_personality_matrix(
+            user1_vector[np.newaxis, :], user2_vector
+        )[0])
+
         # Cache the result
-        self._cache_compatibility(user1_id, user2_id, score)
-        
+        await self._cache_compatibility(user1_id, user2_id, score)
+
         return score
-    
-    def _get_personality_vector(self, user_id: int) -> Optional[List[float]]:
-        """Get personality response vector for a user."""
-        responses = self.db.query(PersonalityResponse)\
-            .filter(PersonalityResponse.user_id == user_id)\
-            .order_by(PersonalityResponse.question_id)\
-            .all()
-        
-        if len(responses) != settings.PERSONALITY_QUESTIONS_COUNT:
+
+    async def _get_personality_vector(self, user_id: int) -> Optional[np.ndarray]:
+        """Get personality response vector for a user, ready for the kernel."""
+        # The denormalized 10-byte blob on users is a single narrow fetch;
+        # fall back to the response rows for users written before the column
+        # existed (or inserted directly in tests)
+        result = await self.db.execute(_PERSONALITY_PACKED_STMT, {"uid": user_id})
+        packed = result.scalar_one_or_none()
+        if packed is not None and len(packed) == settings.PERSONALITY_QUESTIONS_COUNT:
+            return np.frombuffer(packed, dtype=np.uint8)
+
+        result = await self.db.execute(_PERSONALITY_ROWS_STMT, {"uid": user_id})
+        values = result.scalars().all()
+
+        if len(values) != settings.PERSONALITY_QUESTIONS_COUNT:
             return None
-        
-        return [float(r.response_value) for r in responses]
-    
+
+        return np.asarray(values, dtype=np.uint8)
+
+    def _stack_candidate_vectors(self, candidates: List[User]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pivot candidate questionnaire answers into a dense (N x 10) uint8
+        matrix plus a boolean mask of rows with a complete questionnaire.
+
+        Prefers the denormalized 10-byte vector; falls back to the
+        eager-loaded response rows for pre-migration users.
+        """
+        question_count = settings.PERSONALITY_QUESTIONS_COUNT
+        matrix = np.zeros((len(candidates), question_count), dtype=np.uint8)
+        complete = np.zeros(len(candidates), dtype=bool)
+        for i, candidate in enumerate(candidates):
+            packed = candidate.personality_vector
+            if packed is not None and len(packed) == question_count:
+                matrix[i] = np.frombuffer(packed, dtype=np.uint8)
+                complete[i] = True
+            elif len(candidate.personality_responses) == question_count:
+                responses = sorted(
+                    candidate.personality_responses, key=lambda r: r.question_id
+                )
+                matrix[i] = [r.response_value for r in responses]
+                complete[i] = True
+        return matrix, complete
+
     def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """Calculate cosine similarity between two vectors."""
         if len(vec1) != len(vec2):
             return 0.0
-        
-        vec1_np = np.array(vec1)
-        vec2_np = np.array(vec2)
-        
-        dot_product = np.dot(vec1_np, vec2_np)
-        norm1 = np.linalg.norm(vec1_np)
-        norm2 = np.linalg.norm(vec2_np)
-        
-        if norm1 == 0 or norm2 == 0:
+
+        # All-zero vectors (empty fixtures, cold start) are similarity 0 by
+        # definition; a pure-Python any() settles that without allocating a
+        # single ndarray
+        if not any(vec1) or not any(vec2):
             return 0.0
-        
-        return float(dot_product / (norm1 * norm2))
-    
-    def _get_cached_compatibility(self, user1_id: int, user2_id: int) -> Optional[float]:
+
+        # For long vectors, one SIMD FFI call beats the three NumPy calls
+        # below. Below that size NumPy's overhead is already negligible and
+        # its exact arithmetic is preferable to simsimd's fast-math kernels.
+        if simsimd is not None and len(vec1) >= self.SIMSIMD_MIN_DIM:
+            vec1_np = np.ascontiguousarray(vec1, dtype=np.float32)
+            vec2_np = np.ascontiguousarray(vec2, dtype=np.float32)
+            return float(1.0 - simsimd.cosine(vec1_np, vec2_np))
+
+        # float32 halves memory traffic; vdot skips linalg.norm's dispatch
+        # overhead and defers a single sqrt to after the product
+        vec1_np = np.asarray(vec1, dtype=np.float32)
+        vec2_np = np.asarray(vec2, dtype=np.float32)
+
+        denom_sq = np.vdot(vec1_np, vec1_np) * np.vdot(vec2_np, vec2_np)
+        if denom_sq == 0:
+            return 0.0
+
+        return float(np.dot(vec1_np, vec2_np) / math.sqrt(denom_sq))
+
+    async def _get_cached_compatibility(self, user1_id: int, user2_id: int) -> Optional[float]:
         """Get cached compatibility score if it exists and is recent."""
-        # Ensure consistent ordering
-        if user1_id > user2_id:
-            user1_id, user2_id = user2_id, user1_id
-        
-        # Check for cache entry from last 24 hours
-        cache_cutoff = datetime.utcnow() - timedelta(hours=24)
-        cached = self.db.query(CompatibilityCache)\
-            .filter(
-                and_(
-                    CompatibilityCache.user1_id == user1_id,
-                    CompatibilityCache.user2_id == user2_id,
-                    CompatibilityCache.calculated_at > cache_cutoff
-                )
-            ).first()
-        
-        return cached.compatibility_score if cached else None
-    
-    def _cache_compatibility(self, user1_id: int, user2_id: int, score: float):
+        # A Redis GET is an order of magnitude cheaper than the old SQL
+        # probe, and the key TTL replaces the calculated_at cutoff
+        raw = await cache.cache_get(cache.compatibility_key(user1_id, user2_id))
+        return float(raw) if raw is not None else None
+
+    async def _cache_compatibility(self, user1_id: int, user2_id: int, score: float):
         """Cache compatibility score."""
-        # Ensure consistent ordering
-        if user1_id > user2_id:
-            user1_id, user2_id = user2_id, user1_id
-        
-        # Remove old cache entry if exists
-        self.db.query(CompatibilityCache)\
-            .filter(
-                and_(
-                    CompatibilityCache.user1_id == user1_id,
-                    CompatibilityCache.user2_id == user2_id
-                )
-            ).delete()
-        
-        # Add new cache entry
-        cache_entry = CompatibilityCache(
-            user1_id=user1_id,
-            user2_id=user2_id,
-            compatibility_score=score
+        # SETEX replaces the old DELETE+INSERT+COMMIT against the
+        # compatibility_cache table; no transaction, no lock phases
+        await cache.cache_set(
+            cache.compatibility_key(user1_id, user2_id),
+            repr(score),
+            cache.COMPATIBILITY_TTL_SECONDS
         )
-        self.db.add(cache_entry)
-        self.db.commit()
-    
-    def generate_daily_selection(self, user_id: int) -> List[DailySelectionCandidate]:
+
+    async def generate_daily_selection(self, user_id: int) -> List[DailySelectionCandidate]:
         """
         Generate daily selection for a user.
         Returns 3-5 highly compatible profiles.
         """
-        user = self.db.query(User).filter(User.id == user_id).first()
+        result = await self.db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
         if not user:
             return []
-        
-        # Get excluded user IDs (already chosen, matched, or in recent selections)
-        excluded_ids = self._get_excluded_user_ids(user_id)
-        
-        # Get potential candidates
-        candidates = self._get_potential_candidates(user, excluded_ids)
-        
-        # Calculate compatibility scores and rank
-        scored_candidates = []
-        for candidate in candidates:
-            score = self.calculate_compatibility_score(user_id, candidate.id)
-            if score >= settings.COMPATIBILITY_THRESHOLD:
-                scored_candidates.append((candidate, score))
-        
-        # Sort by score descending and take top candidates
-        scored_candidates.sort(key=lambda x: x[1], reverse=True)
+
+        # The nightly batch job already ranked this user's candidates; when
+        # its rows exist, selection is one indexed read with the eligibility
+        # filters re-applied. Otherwise score the pool online.
+        scored_candidates = await self._get_precomputed_candidates(user)
+
+        user_vector = None
+        candidates = []
+        if not scored_candidates:
+            # Get potential candidates; exclusions are anti-joined in SQL
+            candidates = await self._get_potential_candidates(user)
+            user_vector = await self._get_personality_vector(user_id)
+
+        # Score the whole pool in one vectorized kernel call instead of a
+        # per-candidate fetch-and-score round-trip
+        if candidates and user_vector is not None:
+            matrix, complete = self._stack_candidate_vectors(candidates)
+            scores = score_personality_matrix(matrix, user_vector)
+            eligible = np.where(
+                complete & (scores >= settings.COMPATIBILITY_THRESHOLD)
+            )[0]
+            # Sorted by score descending
+            scored_candidates = [
+                (candidates[i], float(scores[i]))
+                for i in eligible[np.argsort(-scores[eligible])]
+            ]
+
         top_candidates = scored_candidates[:settings.MAX_DAILY_PROFILES]
-        
+
         # Ensure minimum number of profiles
         if len(top_candidates) < settings.MIN_DAILY_PROFILES and len(scored_candidates) >= settings.MIN_DAILY_PROFILES:
             top_candidates = scored_candidates[:settings.MIN_DAILY_PROFILES]
-        
-        # Convert to response format
+
+        # Convert to response format; the fields are our own trusted data,
+        # so construct() skips a pointless validation pass per candidate
         selection_candidates = []
         for i, (candidate, score) in enumerate(top_candidates):
             selection_candidates.append(
-                DailySelectionCandidate(
+                DailySelectionCandidate.model_construct(
                     user_id=candidate.id,
                     first_name=candidate.first_name,
                     age=candidate.age,
@@ -158,125 +256,192 @@ class MatchingService:
                     rank_position=i + 1
                 )
             )
-        
+
         # Store the selection in database
-        self._store_daily_selection(user_id, selection_candidates)
-        
+        await self._store_daily_selection(user_id, selection_candidates)
+
         return selection_candidates
-    
-    def _get_excluded_user_ids(self, user_id: int) -> List[int]:
-        """Get list of user IDs to exclude from matching."""
-        excluded_ids = [user_id]  # Exclude self
-        
-        # Exclude users already chosen in last 30 days
-        cutoff_date = datetime.utcnow() - timedelta(days=30)
-        chosen_users = self.db.query(UserChoice.chosen_user_id)\
-            .filter(
-                and_(
-                    UserChoice.user_id == user_id,
-                    UserChoice.choice_date > cutoff_date
-                )
-            ).all()
-        excluded_ids.extend([choice.chosen_user_id for choice in chosen_users])
-        
-        # Exclude users from recent daily selections (last 7 days)
-        recent_selections = self.db.query(DailySelection.candidate_user_id)\
-            .filter(
-                and_(
-                    DailySelection.user_id == user_id,
-                    DailySelection.selection_date > datetime.utcnow() - timedelta(days=7)
-                )
-            ).all()
-        excluded_ids.extend([selection.candidate_user_id for selection in recent_selections])
-        
-        return list(set(excluded_ids))
-    
-    def _get_potential_candidates(self, user: User, excluded_ids: List[int]) -> List[User]:
-        """Get potential candidates for matching."""
-        # Basic filtering criteria
-        query = self.db.query(User)\
-            .filter(
-                and_(
-                    User.id.notin_(excluded_ids),
-                    User.is_active == True,
-                    User.gender != user.gender,  # Opposite gender for MVP
-                    func.abs(User.age - user.age) <= 10  # Age range ±10 years
-                )
+
+    def _excluded_user_ids_select(self, user_id: int):
+        """
+        Subquery of user IDs to exclude from matching: users chosen in the
+        last 30 days plus users shown in the last 7 days of selections.
+
+        Keeping the exclusion set inside the candidate query lets the
+        database anti-join against the indexed bookkeeping tables directly
+        instead of shipping the IDs to Python and re-sending them.
+        """
+        recently_chosen = select(UserChoice.chosen_user_id).where(
+            and_(
+                UserChoice.user_id == user_id,
+                UserChoice.choice_date > datetime.utcnow() - timedelta(days=30)
             )
-        
+        )
+        recently_selected = select(DailySelection.candidate_user_id).where(
+            and_(
+                DailySelection.user_id == user_id,
+                DailySelection.selection_date > datetime.utcnow() - timedelta(days=7)
+            )
+        )
+        # UNION ALL: NOT IN doesn't care about duplicates, so skip the
+        # implicit sort/dedup a plain UNION would add
+        return recently_chosen.union_all(recently_selected)
+
+    def _candidate_filters(
+        self, user: User, extra_excluded_ids: Optional[List[int]] = None
+    ) -> List:
+        """
+        WHERE conditions for candidate eligibility, shared between the
+        online candidate query and the precomputed-ranking read so the two
+        paths can never drift apart.
+        """
+        conditions = [
+            User.id != user.id,
+            User.id.notin_(self._excluded_user_ids_select(user.id)),
+            User.is_active == True,
+            User.gender != user.gender,  # Opposite gender for MVP
+            # Sargable range instead of abs() so the age index is usable
+            User.age.between(user.age - 10, user.age + 10)
+        ]
+
+        if extra_excluded_ids:
+            conditions.append(User.id.notin_(extra_excluded_ids))
+
         # Location-based filtering (within reasonable distance)
         if user.location_latitude and user.location_longitude:
-            # Simple distance filtering - can be improved with proper geospatial queries
-            query = query.filter(
+            # Bounding box of the MATCH_RADIUS_KM haversine circle, with
+            # the longitude range widened by cos(latitude) so the box stays
+            # the same physical size at every latitude. Plain BETWEEN
+            # ranges keep the filter index-backed with no geospatial
+            # extension.
+            delta_lat = self.MATCH_RADIUS_KM / self.KM_PER_DEGREE_LAT
+            delta_lon = self.MATCH_RADIUS_KM / (
+                self.KM_PER_DEGREE_LAT
+                * max(math.cos(math.radians(user.location_latitude)), 0.01)
+            )
+            conditions.append(
+                User.location_latitude.between(
+                    user.location_latitude - delta_lat,
+                    user.location_latitude + delta_lat
+                )
+            )
+            conditions.append(
+                User.location_longitude.between(
+                    user.location_longitude - delta_lon,
+                    user.location_longitude + delta_lon
+                )
+            )
+
+        return conditions
+
+    async def _get_precomputed_candidates(
+        self, user: User
+    ) -> List[Tuple[User, float]]:
+        """
+        Read this user's nightly-precomputed ranking, highest score first.
+
+        The batch job ranks on compatibility alone, so eligibility
+        (activity, gender, age, distance, exclusions) is re-applied here at
+        read time; returns an empty list when the job has not covered this
+        user yet, in which case the caller scores online.
+        """
+        result = await self.db.execute(
+            select(User, UserTopK.score)
+            .join(UserTopK, UserTopK.candidate_user_id == User.id)
+            .where(
                 and_(
-                    User.location_latitude.isnot(None),
-                    User.location_longitude.isnot(None)
+                    UserTopK.user_id == user.id,
+                    UserTopK.score >= settings.COMPATIBILITY_THRESHOLD,
+                    *self._candidate_filters(user)
                 )
             )
-        
-        return query.limit(50).all()  # Limit to 50 for performance
-    
-    def _store_daily_selection(self, user_id: int, candidates: List[DailySelectionCandidate]):
+            .order_by(UserTopK.rank_position)
+            .limit(settings.MAX_DAILY_PROFILES)
+        )
+        return [(candidate, score) for candidate, score in result.all()]
+
+    async def _get_potential_candidates(
+        self, user: User, extra_excluded_ids: Optional[List[int]] = None
+    ) -> List[User]:
+        """Get potential candidates for matching."""
+        # All filtering happens in SQL so only plausible candidates leave
+        # the database; pull each candidate's personality responses in the
+        # same round-trip batch to avoid N+1 lazy loads. populate_existing
+        # refreshes candidates already sitting in the identity map so stale
+        # response collections never reach the scorer (a no-op for the
+        # fresh session of a normal request).
+        stmt = select(User)\
+            .execution_options(populate_existing=True)\
+            .options(selectinload(User.personality_responses))\
+            .where(and_(*self._candidate_filters(user, extra_excluded_ids)))
+
+        result = await self.db.execute(stmt.limit(50))  # Limit to 50 for performance
+        return result.scalars().all()
+
+    async def _store_daily_selection(self, user_id: int, candidates: List[DailySelectionCandidate]):
         """Store daily selection in database."""
         selection_date = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
-        
+
         # Remove any existing selection for today
-        self.db.query(DailySelection)\
-            .filter(
+        await self.db.execute(
+            delete(DailySelection)
+            .where(
                 and_(
                     DailySelection.user_id == user_id,
                     func.date(DailySelection.selection_date) == selection_date.date()
                 )
-            ).delete()
-        
-        # Add new selections
-        for candidate in candidates:
-            selection = DailySelection(
-                user_id=user_id,
-                candidate_user_id=candidate.user_id,
-                compatibility_score=candidate.compatibility_score,
-                selection_date=selection_date,
-                rank_position=candidate.rank_position
             )
-            self.db.add(selection)
-        
-        self.db.commit()
-    
-    def get_today_selection(self, user_id: int) -> List[DailySelectionCandidate]:
+        )
+
+        # Add new selections with one multi-row INSERT instead of one
+        # unit-of-work entry and statement per row
+        if candidates:
+            await self.db.execute(
+                insert(DailySelection).values([
+                    {
+                        "user_id": user_id,
+                        "candidate_user_id": candidate.user_id,
+                        "compatibility_score": candidate.compatibility_score,
+                        "selection_date": selection_date,
+                        "rank_position": candidate.rank_position
+                    }
+                    for candidate in candidates
+                ])
+            )
+
+        await self.db.commit()
+
+    async def get_today_selection(self, user_id: int) -> List[DailySelectionCandidate]:
         """Get today's selection for a user."""
         today = datetime.utcnow().date()
-        
-        selections = self.db.query(DailySelection)\
-            .filter(
+
+        # One JOIN brings back each selection row with its candidate's
+        # profile, instead of one User SELECT per candidate
+        result = await self.db.execute(
+            select(DailySelection, User)
+            .join(User, User.id == DailySelection.candidate_user_id)
+            .where(
                 and_(
                     DailySelection.user_id == user_id,
                     func.date(DailySelection.selection_date) == today
                 )
-            )\
-            .order_by(DailySelection.rank_position)\
-            .all()
-        
-        if not selections:
+            )
+            .order_by(DailySelection.rank_position)
+        )
+        rows = result.all()
+
+        if not rows:
             # Generate new selection if none exists
-            return self.generate_daily_selection(user_id)
-        
-        # Convert to response format
-        candidates = []
-        for selection in selections:
-            candidate_user = self.db.query(User)\
-                .filter(User.id == selection.candidate_user_id)\
-                .first()
-            
-            if candidate_user:
-                candidates.append(
-                    DailySelectionCandidate(
-                        user_id=candidate_user.id,
-                        first_name=candidate_user.first_name,
-                        age=candidate_user.age,
-                        location_city=candidate_user.location_city,
-                        compatibility_score=selection.compatibility_score,
-                        rank_position=selection.rank_position
-                    )
-                )
-        
-        return candidates
\ No newline at end of file
+            return await self.generate_daily_selection(user_id)
+
+        return [
+            DailySelectionCandidate.model_construct(
+                user_id=candidate_user.id,
+                first_name=candidate_user.first_name,
+                age=candidate_user.age,
+                location_city=candidate_user.location_city,
+                compatibility_score=selection.compatibility_score,
+                rank_position=selection.rank_position
+            )
+            for selection, candidate_user in rows
+        ]
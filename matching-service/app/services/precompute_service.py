@@ -0,0 +1,90 @@
+"""
+Offline precomputation of the compatibility ranking.
+
+Personality vectors change rarely, so the pairwise score matrix can be
+recomputed in a nightly batch sweep of the JIT kernel and the top-K
+candidates per user materialized into user_topk. Daily-selection reads
+then reduce to an indexed, pre-ranked JOIN, with eligibility filters
+re-applied at read time.
+
+Run the refresh from the nightly scheduler as:
+
+    python -m app.services.precompute_service
+"""
+import asyncio
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.user import User, UserTopK
+from app.services.matching_service import score_personality_matrix
+
+# Candidates kept per user; generous enough that read-time filtering
+# (exclusions, age, distance) still leaves a full daily selection
+TOP_K = 50
+
+# Rows per INSERT statement while refilling the table
+INSERT_BATCH_SIZE = 5000
+
+async def refresh_top_k(db: AsyncSession, k: int = TOP_K) -> int:
+    """
+    Rebuild user_topk from scratch; returns the number of rows written.
+
+    Intended to run from a nightly scheduler (cron / worker beat), not
+    from request handlers.
+    """
+    result = await db.execute(
+        select(User.id, User.personality_vector).where(
+            User.is_active == True,
+            User.personality_vector.isnot(None)
+        )
+    )
+    rows = [
+        (user_id, packed)
+        for user_id, packed in result.all()
+        if len(packed) == settings.PERSONALITY_QUESTIONS_COUNT
+    ]
+
+    entries = []
+    k = min(k, len(rows) - 1)
+    if k > 0:
+        user_ids = [user_id for user_id, _ in rows]
+        matrix = np.frombuffer(
+            b"".join(packed for _, packed in rows), dtype=np.uint8
+        ).reshape(len(rows), settings.PERSONALITY_QUESTIONS_COUNT)
+
+        for i in range(len(rows)):
+            scores = score_personality_matrix(matrix, matrix[i])
+            scores[i] = -1.0  # never rank a user against themselves
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            entries.extend(
+                {
+                    "user_id": user_ids[i],
+                    "candidate_user_id": user_ids[j],
+                    "score": float(scores[j]),
+                    "rank_position": rank + 1
+                }
+                for rank, j in enumerate(top)
+            )
+
+    await db.execute(delete(UserTopK))
+    for start in range(0, len(entries), INSERT_BATCH_SIZE):
+        await db.execute(
+            insert(UserTopK).values(entries[start:start + INSERT_BATCH_SIZE])
+        )
+    await db.commit()
+
+    return len(entries)
+
+async def _run() -> None:
+    from app.core.database import SessionLocal
+
+    async with SessionLocal() as db:
+        rows = await refresh_top_k(db)
+    print(f"user_topk refreshed: {rows} rows")
+
+if __name__ == "__main__":
+    asyncio.run(_run())
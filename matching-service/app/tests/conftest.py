@@ -1,51 +1,65 @@
+import asyncio
+
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 from app.core.database import Base, get_db
 from app.models.user import User, PersonalityResponse
+from app.services import _kernels
 from main import app
 
+# TestClient runs the lifespan (and thus the Numba warmup) in a portal
+# thread; if the parallel runtime is first initialized off the main thread
+# its worker pool never shuts down and pytest hangs at exit. Warm up here,
+# on the main thread, so the lifespan warmups find it already initialized.
+_kernels.warmup()
+
 # Test database URL (using SQLite for simplicity in tests)
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# NullPool so connections never outlive the event loop they were created on
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
+async def override_get_db():
+    async with TestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 app.dependency_overrides[get_db] = override_get_db
 
-@pytest.fixture(scope="function")
-def db_session():
+async def _create_schema():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def _drop_schema():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+@pytest_asyncio.fixture(scope="function")
+async def db_session():
     """Create a test database session."""
-    Base.metadata.create_all(bind=engine)
+    await _create_schema()
     db = TestingSessionLocal()
     try:
         yield db
     finally:
-        db.close()
-        Base.metadata.drop_all(bind=engine)
+        await db.close()
+        await _drop_schema()
 
 @pytest.fixture(scope="function")
 def client():
     """Create a test client."""
-    Base.metadata.create_all(bind=engine)
+    asyncio.run(_create_schema())
     try:
         with TestClient(app) as c:
             yield c
     finally:
-        Base.metadata.drop_all(bind=engine)
+        asyncio.run(_drop_schema())
 
-@pytest.fixture
-def sample_user(db_session):
+@pytest_asyncio.fixture
+async def sample_user(db_session):
     """Create a sample user for testing."""
     user = User(
         email="test@example.com",
@@ -57,12 +71,12 @@ def sample_user(db_session):
         location_longitude=2.3522
     )
     db_session.add(user)
-    db_session.commit()
-    db_session.refresh(user)
+    await db_session.commit()
+    await db_session.refresh(user)
     return user
 
-@pytest.fixture
-def sample_user_with_personality(db_session, sample_user):
+@pytest_asyncio.fixture
+async def sample_user_with_personality(db_session, sample_user):
     """Create a user with personality responses."""
     # Add personality responses (1-5 scale for 10 questions)
     responses = [
@@ -71,5 +85,5 @@ def sample_user_with_personality(db_session, sample_user):
     ]
     for response in responses:
         db_session.add(response)
-    db_session.commit()
-    return sample_user
\ No newline at end of file
+    await db_session.commit()
+    return sample_user
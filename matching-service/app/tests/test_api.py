@@ -102,6 +102,31 @@ def test_invalid_personality_questionnaire(client):
     assert response.status_code == 400
     assert "exactly 10 responses" in response.json()["detail"]
 
+def test_duplicate_question_personality_questionnaire(client):
+    """Test personality questionnaire answering the same question twice."""
+    # First create a user
+    user_data = {
+        "email": "test@example.com",
+        "first_name": "John",
+        "age": 25,
+        "gender": "male",
+        "location_city": "Paris"
+    }
+    user_response = client.post("/api/v1/users/", json=user_data)
+    user_id = user_response.json()["id"]
+
+    # Ten responses, but question 1 answered twice and question 10 missing
+    questionnaire_data = {
+        "responses": [
+            {"question_id": max(i, 1), "response_value": 3}
+            for i in range(0, 10)
+        ]
+    }
+
+    response = client.post(f"/api/v1/users/{user_id}/personality", json=questionnaire_data)
+    assert response.status_code == 400
+    assert "exactly once" in response.json()["detail"]
+
 def test_get_daily_selection_without_personality(client):
     """Test getting daily selection for user without personality responses."""
     # Create a user
@@ -1,8 +1,10 @@
 import pytest
 from app.services.matching_service import MatchingService
+from app.services.precompute_service import refresh_top_k
 from app.models.user import User, PersonalityResponse
 
-def test_calculate_compatibility_score(db_session):
+@pytest.mark.asyncio
+async def test_calculate_compatibility_score(db_session):
     """Test compatibility score calculation between users."""
     # Create two users
     user1 = User(
@@ -21,9 +23,9 @@ def test_calculate_compatibility_score(db_session):
     )
     db_session.add(user1)
     db_session.add(user2)
-    db_session.commit()
-    db_session.refresh(user1)
-    db_session.refresh(user2)
+    await db_session.commit()
+    await db_session.refresh(user1)
+    await db_session.refresh(user2)
     
     # Add similar personality responses for high compatibility
     for i in range(1, 11):
@@ -31,16 +33,17 @@ def test_calculate_compatibility_score(db_session):
         response2 = PersonalityResponse(user_id=user2.id, question_id=i, response_value=3)
         db_session.add(response1)
         db_session.add(response2)
-    db_session.commit()
+    await db_session.commit()
     
     # Test compatibility calculation
     matching_service = MatchingService(db_session)
-    score = matching_service.calculate_compatibility_score(user1.id, user2.id)
+    score = await matching_service.calculate_compatibility_score(user1.id, user2.id)
     
     # Should be 1.0 (perfect match) since all responses are identical
     assert score == 1.0
 
-def test_calculate_compatibility_score_different_responses(db_session):
+@pytest.mark.asyncio
+async def test_calculate_compatibility_score_different_responses(db_session):
     """Test compatibility score with different personality responses."""
     # Create two users
     user1 = User(
@@ -59,9 +62,9 @@ def test_calculate_compatibility_score_different_responses(db_session):
     )
     db_session.add(user1)
     db_session.add(user2)
-    db_session.commit()
-    db_session.refresh(user1)
-    db_session.refresh(user2)
+    await db_session.commit()
+    await db_session.refresh(user1)
+    await db_session.refresh(user2)
     
     # Add completely different personality responses
     for i in range(1, 11):
@@ -69,17 +72,18 @@ def test_calculate_compatibility_score_different_responses(db_session):
         response2 = PersonalityResponse(user_id=user2.id, question_id=i, response_value=5)
         db_session.add(response1)
         db_session.add(response2)
-    db_session.commit()
+    await db_session.commit()
     
     # Test compatibility calculation
     matching_service = MatchingService(db_session)
-    score = matching_service.calculate_compatibility_score(user1.id, user2.id)
+    score = await matching_service.calculate_compatibility_score(user1.id, user2.id)
     
     # Should be low compatibility
     assert 0.0 <= score <= 1.0
     assert score < 0.5  # Should be quite low for opposite responses
 
-def test_generate_daily_selection(db_session):
+@pytest.mark.asyncio
+async def test_generate_daily_selection(db_session):
     """Test daily selection generation."""
     # Create main user
     main_user = User(
@@ -91,8 +95,8 @@ def test_generate_daily_selection(db_session):
         is_premium=False
     )
     db_session.add(main_user)
-    db_session.commit()
-    db_session.refresh(main_user)
+    await db_session.commit()
+    await db_session.refresh(main_user)
     
     # Add personality responses for main user
     for i in range(1, 11):
@@ -110,8 +114,8 @@ def test_generate_daily_selection(db_session):
             location_city="Paris"
         )
         db_session.add(candidate)
-        db_session.commit()
-        db_session.refresh(candidate)
+        await db_session.commit()
+        await db_session.refresh(candidate)
         candidates.append(candidate)
         
         # Add personality responses (varying similarity)
@@ -124,11 +128,11 @@ def test_generate_daily_selection(db_session):
             )
             db_session.add(response)
     
-    db_session.commit()
+    await db_session.commit()
     
     # Test daily selection generation
     matching_service = MatchingService(db_session)
-    selection = matching_service.generate_daily_selection(main_user.id)
+    selection = await matching_service.generate_daily_selection(main_user.id)
     
     # Should return candidates
     assert len(selection) > 0
@@ -138,7 +142,8 @@ def test_generate_daily_selection(db_session):
     for i in range(1, len(selection)):
         assert selection[i-1].compatibility_score >= selection[i].compatibility_score
 
-def test_cosine_similarity(db_session):
+@pytest.mark.asyncio
+async def test_cosine_similarity(db_session):
     """Test cosine similarity calculation."""
     matching_service = MatchingService(db_session)
     
@@ -158,4 +163,58 @@ def test_cosine_similarity(db_session):
     vec5 = [1, 1, 1]
     vec6 = [-1, -1, -1]
     similarity = matching_service._cosine_similarity(vec5, vec6)
-    assert similarity == -1.0
\ No newline at end of file
+    assert similarity == -1.0
+
+@pytest.mark.asyncio
+async def test_refresh_top_k_and_precomputed_selection(db_session):
+    """Test the nightly top-K refresh and the precomputed selection path."""
+    # Create main user with a packed personality vector
+    main_user = User(
+        email="main@example.com",
+        first_name="Main",
+        age=25,
+        gender="female",
+        location_city="Paris",
+        personality_vector=bytes([3] * 10)
+    )
+    db_session.add(main_user)
+
+    # Create candidate users with varying similarity to the main user
+    vectors = [
+        bytes([3] * 10),                # identical
+        bytes([3] * 9 + [4]),           # close
+        bytes([1, 5] * 5),              # dissimilar
+    ]
+    candidates = []
+    for j, vector in enumerate(vectors):
+        candidate = User(
+            email=f"candidate{j}@example.com",
+            first_name=f"Candidate{j}",
+            age=25 + j,
+            gender="male",
+            location_city="Paris",
+            personality_vector=vector
+        )
+        db_session.add(candidate)
+        candidates.append(candidate)
+
+    await db_session.commit()
+
+    # The batch job should rank every user against all 3 others
+    rows_written = await refresh_top_k(db_session)
+    assert rows_written == 4 * 3
+
+    # The selection should now come from the precomputed ranking
+    matching_service = MatchingService(db_session)
+    precomputed = await matching_service._get_precomputed_candidates(main_user)
+    assert len(precomputed) > 0
+
+    selection = await matching_service.generate_daily_selection(main_user.id)
+
+    # Only the opposite-gender candidates above the threshold qualify
+    assert len(selection) > 0
+    assert all(c.first_name.startswith("Candidate") for c in selection)
+
+    # Should be sorted by compatibility score (descending)
+    for i in range(1, len(selection)):
+        assert selection[i-1].compatibility_score >= selection[i].compatibility_score
\ No newline at end of file
@@ -7,8 +7,11 @@ without requiring a full database setup. It shows how the core algorithms work.
 """
 
 import json
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Tuple
+
+import numpy as np
 
 # Mock data for demonstration
 SAMPLE_USERS = [
@@ -25,7 +28,7 @@ SAMPLE_USERS = [
         "id": 2,
         "first_name": "Marc",
         "age": 34,
-        "gender": "male", 
+        "gender": "male",
         "location_city": "Lyon",
         "is_premium": True,
         "personality": [4, 4, 4, 4, 3, 5, 4, 3, 4, 4]  # Similar to Sophie
@@ -35,7 +38,7 @@ SAMPLE_USERS = [
         "first_name": "Alice",
         "age": 26,
         "gender": "female",
-        "location_city": "Marseille", 
+        "location_city": "Marseille",
         "is_premium": False,
         "personality": [2, 2, 2, 2, 2, 2, 2, 2, 2, 2]  # Very different from others
     },
@@ -59,130 +62,196 @@ SAMPLE_USERS = [
     }
 ]
 
+@dataclass(frozen=True)
+class UsersSoA:
+    """
+    Columnar (structure-of-arrays) user store.
+
+    Filtering and scoring sweep one field across all users at a time, so
+    parallel arrays keep each pass contiguous and vectorizable where a
+    list of dicts would chase a pointer per record and per field.
+    """
+    ids: np.ndarray             # int32
+    first_names: List[str]
+    ages: np.ndarray            # int16
+    genders: np.ndarray
+    cities: List[str]
+    is_premium: np.ndarray      # bool
+    badges: List[str]           # subscription badge, rendered once
+    personality: np.ndarray     # int8, shape [N, 10]: answers are 1-5
+    inv_norms: np.ndarray       # float32 reciprocal row norms
+
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> "UsersSoA":
+        # Answers fit in a byte: int8 storage is 8x smaller than float64
+        # and keeps the dot products in integer SIMD lanes
+        personality = np.asarray(
+            [r["personality"] for r in records], dtype=np.int8
+        )
+        # Reciprocal norms computed once at load: cosine similarity is
+        # then an integer dot times two cached multipliers, with no
+        # per-pair sqrt or division
+        squared = (personality.astype(np.int32) ** 2).sum(axis=1)
+        return cls(
+            ids=np.array([r["id"] for r in records], dtype=np.int32),
+            first_names=[r["first_name"] for r in records],
+            ages=np.array([r["age"] for r in records], dtype=np.int16),
+            genders=np.array([r["gender"] for r in records]),
+            cities=[r["location_city"] for r in records],
+            is_premium=np.array([r["is_premium"] for r in records], dtype=bool),
+            badges=["⭐" if r["is_premium"] else "🆓" for r in records],
+            personality=personality,
+            inv_norms=(1.0 / np.sqrt(squared)).astype(np.float32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.first_names)
+
+USERS = UsersSoA.from_records(SAMPLE_USERS)
+NAME_INDEX = {name: i for i, name in enumerate(USERS.first_names)}
+
+# Reused % templates for the repeated report lines: one format call per
+# line instead of a field-by-field f-string expansion
+PROFILE_FMT = "   %s %s (%d, %s, %s)"
+CAND_FMT = "      %d. %s %s (%s) - %.3f"
+
+def compute_similarity_matrix(users: UsersSoA) -> np.ndarray:
+    """
+    All-pairs cosine similarity as one symmetric float32 [N, N] matrix.
+
+    One integer matmul amortizes every dot product across the population:
+    after this, any pair score or selection row is a plain gather. Meant
+    to be recomputed at the daily 12:00 PM tick; at 10 questions the
+    dense matrix is 4N^2 bytes, so the triangular-storage trick is not
+    worth the indexing overhead here.
+    """
+    wide = users.personality.astype(np.int16)
+    return (wide @ wide.T) * np.outer(users.inv_norms, users.inv_norms)
+
+SIM = compute_similarity_matrix(USERS)
+
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     """Calculate cosine similarity between two vectors."""
     if len(vec1) != len(vec2):
         return 0.0
-    
-    # Calculate dot product
-    dot_product = sum(a * b for a, b in zip(vec1, vec2))
-    
-    # Calculate norms
-    norm1 = (sum(a * a for a in vec1)) ** 0.5
-    norm2 = (sum(a * a for a in vec2)) ** 0.5
-    
-    if norm1 == 0 or norm2 == 0:
+
+    # One BLAS dot product instead of three Python generator passes
+    vec1 = np.asarray(vec1, dtype=np.float32)
+    vec2 = np.asarray(vec2, dtype=np.float32)
+
+    denom = np.linalg.norm(vec1) * np.linalg.norm(vec2)
+    if denom == 0:
         return 0.0
-    
-    return dot_product / (norm1 * norm2)
-
-def calculate_compatibility(user1: Dict, user2: Dict) -> float:
-    """Calculate compatibility score between two users."""
-    return cosine_similarity(user1["personality"], user2["personality"])
-
-def filter_candidates(user: Dict, all_users: List[Dict]) -> List[Dict]:
-    """Filter potential candidates based on GoldWen criteria."""
-    candidates = []
-    
-    for candidate in all_users:
-        # Skip self
-        if candidate["id"] == user["id"]:
-            continue
-            
-        # Opposite gender (MVP requirement)
-        if candidate["gender"] == user["gender"]:
-            continue
-            
-        # Age range ±10 years
-        if abs(candidate["age"] - user["age"]) > 10:
-            continue
-            
-        candidates.append(candidate)
-    
-    return candidates
-
-def generate_daily_selection(user: Dict, all_users: List[Dict]) -> List[Dict]:
-    """Generate daily selection for a user."""
-    print(f"\n🎯 Generating daily selection for {user['first_name']} (ID: {user['id']})")
-    print(f"   Profile: {user['age']} years old, {user['gender']}, {user['location_city']}")
-    print(f"   Subscription: {'Premium' if user['is_premium'] else 'Free'}")
-    
+
+    return float(vec1 @ vec2 / denom)
+
+def calculate_compatibility(user_idx: int, other_idx: int) -> float:
+    """Calculate compatibility score between two users by row index."""
+    return float(SIM[user_idx, other_idx])
+
+def filter_candidates(user_idx: int, users: UsersSoA) -> np.ndarray:
+    """
+    Filter potential candidates based on GoldWen criteria.
+
+    Returns row indices into the columnar store so the scorer can gather
+    matrix rows directly.
+    """
+    mask = (
+        (users.ids != users.ids[user_idx])                      # skip self
+        & (users.genders != users.genders[user_idx])            # opposite gender (MVP requirement)
+        & (np.abs(users.ages - users.ages[user_idx]) <= 10)     # age range ±10 years
+    )
+    return np.flatnonzero(mask)
+
+def generate_daily_selection(user_idx: int, users: UsersSoA) -> List[Tuple[int, float]]:
+    """Generate daily selection for a user; returns (row index, score) pairs."""
+    # Buffer the report and emit it in one write at the end, instead of
+    # one syscall per line while scoring
+    lines = [""]
+    lines.append(f"🎯 Generating daily selection for {users.first_names[user_idx]} (ID: {users.ids[user_idx]})")
+    lines.append(f"   Profile: {users.ages[user_idx]} years old, {users.genders[user_idx]}, {users.cities[user_idx]}")
+    lines.append(f"   Subscription: {'Premium' if users.is_premium[user_idx] else 'Free'}")
+
     # Filter potential candidates
-    candidates = filter_candidates(user, all_users)
-    print(f"   Found {len(candidates)} potential candidates after filtering")
-    
-    # Calculate compatibility scores
-    scored_candidates = []
-    for candidate in candidates:
-        score = calculate_compatibility(user, candidate)
-        scored_candidates.append({
-            "user": candidate,
-            "compatibility_score": score
-        })
-    
-    # Sort by compatibility score (descending)
-    scored_candidates.sort(key=lambda x: x["compatibility_score"], reverse=True)
-    
-    # Apply compatibility threshold (0.6)
+    cand_idx = filter_candidates(user_idx, users)
+    lines.append(f"   Found {len(cand_idx)} potential candidates after filtering")
+
+    # Selection parameters: compatibility threshold, top 3-5 candidates
     threshold = 0.6
-    qualified_candidates = [c for c in scored_candidates if c["compatibility_score"] >= threshold]
-    
-    # Take top 3-5 candidates
     max_candidates = 5
     min_candidates = 3
-    
-    if len(qualified_candidates) >= min_candidates:
-        selection = qualified_candidates[:max_candidates]
-    else:
-        # If not enough qualified candidates, take best available up to max
-        selection = scored_candidates[:max_candidates]
-    
-    print(f"   📊 Compatibility scores (threshold: {threshold}):")
-    for i, candidate_data in enumerate(selection):
-        candidate = candidate_data["user"]
-        score = candidate_data["compatibility_score"]
+
+    # Candidate scores are a gather from the precomputed all-pairs
+    # matrix: no per-selection dot products at all
+    selection = []
+    if cand_idx.size:
+        scores = SIM[user_idx, cand_idx]
+
+        # O(N) partition keeps the top K, then only those K get sorted,
+        # instead of fully sorting the candidate pool
+        k = min(max_candidates, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        # Apply the threshold unless that would leave too few profiles;
+        # in descending order the qualified scores are a prefix of top
+        if int((scores >= threshold).sum()) >= min_candidates:
+            top = top[scores[top] >= threshold]
+
+        selection = [(int(cand_idx[i]), float(scores[i])) for i in top]
+
+    lines.append(f"   📊 Compatibility scores (threshold: {threshold}):")
+    for i, (candidate_idx, score) in enumerate(selection):
         status = "✅" if score >= threshold else "⚠️"
-        print(f"      {i+1}. {status} {candidate['first_name']} ({candidate['location_city']}) - {score:.3f}")
-    
+        lines.append(CAND_FMT % (
+            i + 1, status, users.first_names[candidate_idx],
+            users.cities[candidate_idx], score
+        ))
+
     # Determine max choices based on subscription
-    max_choices = 3 if user["is_premium"] else 1
-    print(f"   🎫 Max daily choices: {max_choices}")
-    
+    max_choices = 3 if users.is_premium[user_idx] else 1
+    lines.append(f"   🎫 Max daily choices: {max_choices}")
+
+    print("\n".join(lines))
     return selection
 
-def simulate_user_choice(chooser: Dict, chosen: Dict, all_users: List[Dict]) -> bool:
+def simulate_user_choice(chooser_idx: int, chosen_idx: int, users: UsersSoA) -> bool:
     """Simulate a user choice and check for mutual match."""
-    print(f"\n💝 {chooser['first_name']} chooses {chosen['first_name']}")
-    
+    lines = [""]
+    lines.append(f"💝 {users.first_names[chooser_idx]} chooses {users.first_names[chosen_idx]}")
+
     # Check if chosen user would also choose the chooser
     # (In real app, this would check the database for existing choices)
-    
+
     # For demo, let's say users choose each other if compatibility > 0.8
-    compatibility = calculate_compatibility(chooser, chosen)
+    compatibility = calculate_compatibility(chooser_idx, chosen_idx)
     is_mutual = compatibility > 0.8
-    
+
     if is_mutual:
-        print(f"   🎉 IT'S A MATCH! Both users have high compatibility ({compatibility:.3f})")
-        print(f"   💬 24-hour chat window opens for {chooser['first_name']} and {chosen['first_name']}")
-        return True
+        lines.append(f"   🎉 IT'S A MATCH! Both users have high compatibility ({compatibility:.3f})")
+        lines.append(f"   💬 24-hour chat window opens for {users.first_names[chooser_idx]} and {users.first_names[chosen_idx]}")
     else:
-        print(f"   💔 No match yet. Compatibility: {compatibility:.3f}")
-        return False
+        lines.append(f"   💔 No match yet. Compatibility: {compatibility:.3f}")
+
+    print("\n".join(lines))
+    return is_mutual
 
 def demonstrate_matching_service():
     """Demonstrate the GoldWen Matching Service functionality."""
     print("🧡 GoldWen Matching Service Demo")
     print("=" * 50)
-    
+
     print("\n📋 Sample Users:")
-    for user in SAMPLE_USERS:
-        premium_badge = "⭐" if user["is_premium"] else "🆓"
-        print(f"   {premium_badge} {user['first_name']} ({user['age']}, {user['gender']}, {user['location_city']})")
-    
+    for i in range(len(USERS)):
+        print(PROFILE_FMT % (
+            USERS.badges[i], USERS.first_names[i], USERS.ages[i],
+            USERS.genders[i], USERS.cities[i]
+        ))
+
     print("\n🧠 Personality Questionnaire (1-5 scale):")
     questions = [
         "Openness to Experience",
-        "Conscientiousness", 
+        "Conscientiousness",
         "Extraversion",
         "Agreeableness",
         "Neuroticism",
@@ -192,24 +261,26 @@ def demonstrate_matching_service():
         "Relationship Goals",
         "Conflict Resolution"
     ]
-    
+
     for i, question in enumerate(questions):
         print(f"   {i+1}. {question}")
-    
+
     # Demonstrate daily selection for Sophie
-    sophie = SAMPLE_USERS[0]  # Sophie
-    selection = generate_daily_selection(sophie, SAMPLE_USERS)
-    
+    sophie_idx = 0  # Sophie
+    selection = generate_daily_selection(sophie_idx, USERS)
+
     # Simulate Sophie choosing Thomas (highest compatibility)
     if selection:
-        thomas = next(c["user"] for c in selection if c["user"]["first_name"] == "Thomas")
-        if thomas:
-            is_match = simulate_user_choice(sophie, thomas, SAMPLE_USERS)
-    
+        # With the precomputed map this is a row lookup plus a set
+        # membership test, not a per-name scan of nested dicts
+        thomas_idx = NAME_INDEX["Thomas"]
+        if thomas_idx in {idx for idx, _ in selection}:
+            is_match = simulate_user_choice(sophie_idx, thomas_idx, USERS)
+
     # Demonstrate daily selection for Marc
-    marc = SAMPLE_USERS[1]  # Marc  
-    selection_marc = generate_daily_selection(marc, SAMPLE_USERS)
-    
+    marc_idx = 1  # Marc
+    selection_marc = generate_daily_selection(marc_idx, USERS)
+
     print("\n📊 Algorithm Summary:")
     print("   🎯 Content-based filtering using personality vectors")
     print("   📐 Cosine similarity for compatibility scoring")
@@ -217,7 +288,7 @@ def demonstrate_matching_service():
     print("   ⚡ Caching: 24-hour compatibility score cache")
     print("   📅 Daily ritual: 3-5 curated profiles at 12:00 PM")
     print("   💎 Premium: 3 choices/day vs 1 choice/day for free")
-    
+
     print("\n🚀 Ready for production deployment!")
     print("   🐳 Docker containerization")
     print("   🔄 PostgreSQL + Redis stack")
@@ -226,4 +297,4 @@ def demonstrate_matching_service():
     print("   📚 Complete documentation")
 
 if __name__ == "__main__":
-    demonstrate_matching_service()
\ No newline at end of file
+    demonstrate_matching_service()